@@ -0,0 +1,447 @@
+"""Background agent that keeps an unlocked vault in memory.
+
+Opening a vault runs the password KDF, which is deliberately slow. The agent
+pays that cost once and then serves vault operations over a Unix domain
+socket, so scripts that invoke ``avp`` many times only pay it on
+``avp agent start``.
+"""
+
+import base64
+import dataclasses
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import socket
+import struct
+import threading
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Optional
+
+SOCKET_NAME = "avp-agent.sock"
+
+# Client operations the agent is willing to proxy, mirroring AVPClient.
+_METHODS = frozenset({
+    "authenticate",
+    "store",
+    "retrieve",
+    "delete",
+    "list_secrets",
+    "rotate",
+})
+
+_HEADER = struct.Struct("!I")
+
+# Frames larger than this are treated as a broken connection.
+_MAX_FRAME = 16 << 20
+
+# How long to wait for an agent to accept a connection and answer "hello"
+# before assuming it is wedged and opening the vault in-process instead.
+_CONNECT_TIMEOUT = 2.0
+
+
+def get_agent_socket_path() -> Path:
+    """Get the agent socket path."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / SOCKET_NAME
+    return Path.home() / ".avp" / SOCKET_NAME
+
+
+def _encode(obj: Any) -> Any:
+    """
+    Convert a value into JSON-compatible data.
+
+    Everything other than scalars is tagged, so that the receiving side can
+    rebuild bytes, datetimes and the SDK's response types without ever
+    executing code chosen by the peer.
+    """
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, (bytes, bytearray)):
+        return {"t": "bytes", "v": base64.b64encode(obj).decode("ascii")}
+    if isinstance(obj, datetime):
+        return {"t": "datetime", "v": obj.isoformat()}
+    if isinstance(obj, Enum):
+        return {"t": "enum", "c": type(obj).__name__, "v": obj.value}
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {"t": "dataclass", "c": type(obj).__name__, "v": {
+            f.name: _encode(getattr(obj, f.name)) for f in dataclasses.fields(obj)
+        }}
+    if isinstance(obj, BaseException):
+        return {"t": "error", "c": type(obj).__name__, "v": str(obj)}
+    if isinstance(obj, (list, tuple)):
+        return {"t": "list", "v": [_encode(item) for item in obj]}
+    if isinstance(obj, dict):
+        return {"t": "dict", "v": {str(k): _encode(v) for k, v in obj.items()}}
+    raise TypeError(f"Cannot send {type(obj).__name__} to the agent")
+
+
+def _decode(data: Any) -> Any:
+    """Rebuild a value produced by _encode(), allowing only known types."""
+    if not isinstance(data, dict):
+        return data
+
+    tag, value = data.get("t"), data.get("v")
+    if tag == "bytes":
+        return base64.b64decode(value)
+    if tag == "datetime":
+        return datetime.fromisoformat(value)
+    if tag == "list":
+        return [_decode(item) for item in value]
+    if tag == "dict":
+        return {k: _decode(v) for k, v in value.items()}
+    if tag in ("enum", "dataclass"):
+        import avp.types
+
+        cls = getattr(avp.types, data.get("c", ""), None)
+        if tag == "enum" and isinstance(cls, type) and issubclass(cls, Enum):
+            return cls(value)
+        if tag == "dataclass" and dataclasses.is_dataclass(cls):
+            return cls(**{k: _decode(v) for k, v in value.items()})
+    if tag == "error":
+        import avp.errors
+
+        cls = getattr(avp.errors, data.get("c", ""), None)
+        if isinstance(cls, type) and issubclass(cls, avp.errors.AVPError):
+            return cls(value)
+        if data.get("c") == "PermissionError":
+            return PermissionError(value)
+        return RuntimeError(value)
+    raise ValueError(f"Unexpected frame contents: {tag!r}")
+
+
+def _send(sock: socket.socket, obj: Any) -> None:
+    """Send a length-prefixed JSON frame."""
+    payload = json.dumps(_encode(obj)).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Read exactly ``size`` bytes or raise EOFError."""
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise EOFError("Agent connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv(sock: socket.socket) -> Any:
+    """Receive a length-prefixed JSON frame."""
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > _MAX_FRAME:
+        raise EOFError("Agent frame too large")
+    try:
+        return _decode(json.loads(_recv_exact(sock, size)))
+    except (ValueError, TypeError, KeyError) as e:
+        raise EOFError(f"Malformed agent frame: {e}")
+
+
+def _open_socket(path: Path) -> Optional[socket.socket]:
+    """Connect to the agent socket, or return None if no agent is running."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        # Refuse sockets planted by another user.
+        if path.stat().st_uid != os.getuid():
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    except OSError:
+        return None
+    sock.settimeout(_CONNECT_TIMEOUT)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+class AgentClient:
+    """
+    Proxy that forwards AVPClient calls to a running agent.
+
+    Only the operations used by the CLI are supported; results and
+    exceptions are passed through unchanged.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+
+    def _call(self, op: str, *args: Any, **kwargs: Any) -> Any:
+        _send(self._sock, [op, list(args), kwargs])
+        status, value = _recv(self._sock)
+        if status == "error":
+            raise value
+        return value
+
+    def authenticate(self, *args: Any, **kwargs: Any) -> Any:
+        return self._call("authenticate", *args, **kwargs)
+
+    def store(self, *args: Any, **kwargs: Any) -> Any:
+        return self._call("store", *args, **kwargs)
+
+    def retrieve(self, *args: Any, **kwargs: Any) -> Any:
+        return self._call("retrieve", *args, **kwargs)
+
+    def delete(self, *args: Any, **kwargs: Any) -> Any:
+        return self._call("delete", *args, **kwargs)
+
+    def list_secrets(self, *args: Any, **kwargs: Any) -> Any:
+        return self._call("list_secrets", *args, **kwargs)
+
+    def rotate(self, *args: Any, **kwargs: Any) -> Any:
+        return self._call("rotate", *args, **kwargs)
+
+    def close(self) -> None:
+        """Close the connection; the agent keeps the vault unlocked."""
+        self._sock.close()
+
+    def __enter__(self) -> "AgentClient":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def _query(op: str, *args: Any) -> Optional[Any]:
+    """Send a single unauthenticated request, or return None if no agent answers."""
+    sock = _open_socket(get_agent_socket_path())
+    if sock is None:
+        return None
+    try:
+        _send(sock, [op, list(args), {}])
+        return _recv(sock)
+    except (OSError, EOFError):
+        return None
+    finally:
+        sock.close()
+
+
+def connect_agent(vault_path: Path, password: str) -> Optional[AgentClient]:
+    """
+    Connect to a running agent serving ``vault_path``.
+
+    Returns None when no agent is running or it does not answer in time,
+    or when it holds a different vault or was unlocked with a different
+    password, so that callers can fall back to opening the vault in-process.
+    """
+    sock = _open_socket(get_agent_socket_path())
+    if sock is None:
+        return None
+
+    client = AgentClient(sock)
+    try:
+        accepted = client._call("hello", str(vault_path.resolve()), password)
+    except (OSError, EOFError):
+        accepted = False
+    if not accepted:
+        client.close()
+        return None
+    sock.settimeout(None)
+    return client
+
+
+def agent_running() -> bool:
+    """Check whether an agent is listening on the socket."""
+    sock = _open_socket(get_agent_socket_path())
+    if sock is None:
+        return False
+    sock.close()
+    return True
+
+
+def agent_serves(vault_path: Path) -> bool:
+    """Check whether a running agent holds ``vault_path``."""
+    reply = _query("status")
+    return reply is not None and reply[1] == str(vault_path.resolve())
+
+
+def stop_agent() -> bool:
+    """Ask a running agent to shut down. Returns False if none is running."""
+    sock = _open_socket(get_agent_socket_path())
+    if sock is None:
+        return False
+    try:
+        _send(sock, ["shutdown", [], {}])
+        _recv(sock)
+    except (OSError, EOFError):
+        pass
+    finally:
+        sock.close()
+    return True
+
+
+class AgentServer:
+    """
+    Unix socket server holding one authenticated AVPClient.
+
+    The vault file is re-read whenever it changes on disk, so writes made
+    without the agent are not overwritten by the agent's in-memory copy.
+    """
+
+    def __init__(self, client: Any, vault_path: Path, password: str,
+                 path: Optional[Path] = None):
+        import socketserver
+
+        backend = getattr(client, "_backend", None)
+        if not callable(getattr(backend, "_load", None)):
+            raise RuntimeError("The vault backend cannot be reloaded by an agent")
+
+        self.path = path or get_agent_socket_path()
+        self._client = client
+        self._backend = backend
+        self._vault_path = vault_path
+        self._vault = str(vault_path.resolve())
+        self._lock = threading.Lock()
+        self._vault_stat = self._stat_vault()
+        # Keep only a keyed digest of the password for checking callers.
+        self._salt = secrets.token_bytes(16)
+        self._digest = self._hash(password)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            sock = _open_socket(self.path)
+            if sock is not None:
+                sock.close()
+                raise RuntimeError(f"An agent is already running at {self.path}")
+            # Stale socket left behind by an agent that did not shut down.
+            self.path.unlink()
+
+        agent = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                agent._handle(self.request)
+
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(
+                str(self.path), Handler
+            )
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+        os.chmod(self.path, 0o600)
+
+    def _hash(self, password: str) -> bytes:
+        return hashlib.blake2b(password.encode(), key=self._salt).digest()
+
+    def _stat_vault(self) -> Optional[tuple]:
+        """Identify the current vault file contents by inode, size and mtime."""
+        try:
+            st = self._vault_path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _call(self, op: str, args: list, kwargs: dict) -> Any:
+        """Run a client operation against an up-to-date copy of the vault."""
+        with self._lock:
+            current = self._stat_vault()
+            if current != self._vault_stat:
+                self._backend._data = self._backend._load()
+            try:
+                return getattr(self._client, op)(*args, **kwargs)
+            finally:
+                self._vault_stat = self._stat_vault()
+
+    def _handle(self, sock: socket.socket) -> None:
+        """Serve one connection, then end the sessions it opened."""
+        sessions: set = set()
+        try:
+            self._serve(sock, sessions)
+        finally:
+            self._end_sessions(sessions)
+
+    def _serve(self, sock: socket.socket, sessions: set) -> None:
+        """Serve frames from a single connection until it closes."""
+        authorized = False
+        while True:
+            try:
+                op, args, kwargs = _recv(sock)
+            except (OSError, EOFError, ValueError):
+                return
+
+            if op == "shutdown":
+                _send(sock, ["ok", None])
+                self.shutdown()
+                return
+
+            if op == "status":
+                _send(sock, ["ok", self._vault])
+                continue
+
+            if op == "hello":
+                vault, password = args
+                authorized = vault == self._vault and hmac.compare_digest(
+                    self._hash(password), self._digest
+                )
+                _send(sock, ["ok", authorized])
+                continue
+
+            if not authorized or op not in _METHODS:
+                _send(sock, ["error", PermissionError(f"Operation not allowed: {op}")])
+                continue
+
+            try:
+                value = self._call(op, args, kwargs)
+                result = ["ok", value]
+            except Exception as e:
+                result = ["error", e]
+            else:
+                if op == "authenticate" and getattr(value, "session_id", None):
+                    sessions.add(value.session_id)
+            _send(sock, result)
+
+    def _end_sessions(self, sessions: set) -> None:
+        """
+        Terminate sessions opened over a connection that has closed.
+
+        AVPClient only drops an expired session when it is used again, so
+        without this every command served would leave one behind.
+        """
+        if not sessions:
+            return
+        from avp.types import AuthMethod
+
+        with self._lock:
+            client = self._client
+            if client is None:
+                return
+            for session_id in sessions:
+                client.authenticate(auth_method=AuthMethod.TERMINATE,
+                                    auth_data={"session_id": session_id})
+
+    def serve_forever(self) -> None:
+        """Serve requests until shutdown() is called."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            self._release()
+
+    def shutdown(self) -> None:
+        """Stop serving; safe to call from a request handler."""
+        threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def _release(self) -> None:
+        """
+        Drop the cached client and password digest.
+
+        The client is not closed: FileBackend.close() rewrites the vault from
+        memory, and every change the agent made has already been saved.
+        """
+        self._client = None
+        self._backend = None
+        self._digest = b""
+        self._salt = b""
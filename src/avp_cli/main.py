@@ -1,33 +1,302 @@
 """Main CLI entry point for AVP."""
 
+import atexit
+import functools
+import mmap
+import os
+import re
 import sys
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
 import click
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
 
-from avp import AVPClient
-from avp.backends import FileBackend, MemoryBackend
+if TYPE_CHECKING:
+    from avp import AVPClient
+    from rich.console import Console
+
+# KEY=value, optionally exported, quoted, or followed by a " # comment".
+# Matched against the raw file bytes, one line at a time via MULTILINE.
+# Inside an unquoted value, a run of blanks is only taken when more value
+# follows it, so long runs of whitespace cannot cause backtracking.
+_DOTENV_RE = re.compile(
+    rb"""^[ \t]*(?:export[ \t]+)?([A-Za-z_][A-Za-z0-9_.\-]*)[ \t]*=[ \t]*"""
+    rb"""(?:"([^"\n]*)"|'([^'\n]*)'|((?:[^ \t\r\n]|[ \t]+(?=[^ \t\r\n#]))*))"""
+    rb"""(?:[ \t]+#.*)?[ \t]*\r?$""",
+    re.MULTILINE,
+)
+
+# File formats accepted by import-credentials and export.
+_FMT_CHOICE = click.Choice(["json", "env", "dotenv"])
+
+# Console markup tags such as "[red]" or "[/bold]".
+_MARKUP_RE = re.compile(r"\[/?[a-z][a-z ]*\]")
+
+# Import sources larger than this are memory-mapped rather than read.
+_MMAP_THRESHOLD = 1 << 20
+
+# rich and the avp SDK are imported lazily so that one-shot invocations
+# (``--help``, ``--version``, scripted ``get``) only pay for what they use.
+_console_instance = None
+_json = None
+_file_backend_cls = None
+
+# Fernet instances derived from vault passwords, keyed by the vault path and
+# a keyed digest of the password, so that several commands run in one
+# process (tests, scripts driving cli()) pay for the KDF once per vault.
+_KDF_CACHE: "OrderedDict[Tuple[str, bytes], Any]" = OrderedDict()
+_KDF_CACHE_SIZE = 4
+_KDF_CACHE_SALT = os.urandom(16)
+
+
+class _PlainConsole:
+    """
+    Minimal stand-in for rich's Console when stdout is not a terminal.
+
+    Plain strings have their markup tags stripped and are echoed directly,
+    so piped output never imports rich. Tables and panels are still handed
+    to a real Console, created on first use.
+    """
+
+    def __init__(self):
+        self._rich: Optional["Console"] = None
+
+    def print(self, *objects) -> None:
+        if all(isinstance(obj, str) for obj in objects):
+            click.echo(" ".join(_MARKUP_RE.sub("", obj) for obj in objects))
+            return
+        if self._rich is None:
+            from rich.console import Console
+            self._rich = Console()
+        self._rich.print(*objects)
+
+
+def _console() -> "Console":
+    """Return the shared console, creating it on first use."""
+    global _console_instance
+    if _console_instance is None:
+        if sys.stdout.isatty():
+            from rich.console import Console
+            _console_instance = Console()
+        else:
+            _console_instance = _PlainConsole()
+    return _console_instance
+
+
+def _get_json():
+    """Return orjson when installed, otherwise the stdlib json module."""
+    global _json
+    if _json is None:
+        try:
+            import orjson as json_module
+        except ImportError:
+            import json as json_module
+        _json = json_module
+    return _json
+
+
+def _json_dumps(obj) -> str:
+    """Serialize ``obj`` to a JSON string with whichever module is available."""
+    data = _get_json().dumps(obj)
+    return data.decode() if isinstance(data, bytes) else data
+
 
-console = Console()
+def _wipe(buf: bytearray) -> None:
+    """
+    Overwrite a buffer with zeros in place.
+
+    Only mutable buffers can be wiped. The ``str`` password and values
+    taken from the command line, and the ``bytes`` returned by the SDK,
+    are immutable and stay in memory until garbage collected.
+    """
+    if buf:
+        import ctypes
 
+        ctypes.memset((ctypes.c_char * len(buf)).from_buffer(buf), 0, len(buf))
 
+
+@contextmanager
+def _encoded(value: str) -> Iterator[bytearray]:
+    """Encode a credential value into a buffer that is wiped afterwards."""
+    buf = bytearray(value, "utf-8")
+    try:
+        yield buf
+    finally:
+        _wipe(buf)
+
+
+@functools.lru_cache(maxsize=1)
 def get_default_vault_path() -> Path:
     """Get default vault path."""
     return Path.home() / ".avp" / "vault.enc"
 
 
-def create_client(vault: str, password: str) -> AVPClient:
-    """Create AVP client with file backend."""
-    vault_path = Path(vault)
-    vault_path.parent.mkdir(parents=True, exist_ok=True)
-    backend = FileBackend(str(vault_path), password)
+def _resolve_vault(vault: Optional[str]) -> Path:
+    """Resolve the --vault option to a path, falling back to the default."""
+    return Path(vault) if vault else get_default_vault_path()
+
+
+def _require_vault(vault_path: Path) -> None:
+    """Exit with an error if the vault does not exist."""
+    if not vault_path.exists():
+        _console().print(f"[red]Error:[/red] No vault found at {vault_path}")
+        _console().print("Run 'avp init' to create a new vault.")
+        sys.exit(1)
+
+
+def _prompt_password(password: Optional[str], from_stdin: bool = False,
+                     confirm: bool = False) -> str:
+    """
+    Return the vault password from --password, stdin, or an interactive prompt.
+
+    With ``from_stdin`` a single line is read from standard input, so scripts
+    can pipe the password in without it showing up in the process list.
+    """
+    if from_stdin:
+        if password is not None:
+            raise click.UsageError("--password and --password-stdin are mutually exclusive")
+        line = sys.stdin.readline()
+        if not line:
+            raise click.UsageError("No password provided on stdin")
+        return line.rstrip("\r\n")
+    if password is None:
+        password = click.prompt("Password", hide_input=True, confirmation_prompt=confirm)
+    return password
+
+
+def create_client(vault_path: Path, password: str, ensure_dir: bool = False) -> "AVPClient":
+    """Create AVP client, preferring a running agent over the file backend."""
+    from avp_cli.agent import connect_agent
+
+    client = connect_agent(vault_path, password)
+    if client is not None:
+        return client
+    return open_vault(vault_path, password, ensure_dir=ensure_dir)
+
+
+def open_vault(vault_path: Path, password: str, ensure_dir: bool = False) -> "AVPClient":
+    """
+    Create AVP client with file backend.
+
+    Pass ``ensure_dir=True`` from commands that may create the vault file.
+    """
+    from avp import AVPClient
+
+    if ensure_dir:
+        vault_path.parent.mkdir(parents=True, exist_ok=True)
+    backend = _file_backend()(str(vault_path), password)
     return AVPClient(backend)
 
 
+def _file_backend():
+    """Return a FileBackend subclass that reuses derived keys via _KDF_CACHE."""
+    global _file_backend_cls
+    if _file_backend_cls is not None:
+        return _file_backend_cls
+
+    import hashlib
+
+    from avp.backends.file import FileBackend
+
+    # The cache hooks into private SDK internals; if they are gone, open
+    # vaults the slow way rather than fail.
+    if not callable(getattr(FileBackend, "_create_fernet", None)):
+        _file_backend_cls = FileBackend
+        return _file_backend_cls
+
+    class CachedKeyFileBackend(FileBackend):
+        # The SDK derives the key from the password and a fixed salt only, so
+        # the file's mtime is deliberately not part of the cache key: every
+        # store rewrites the vault and would otherwise evict the entry. If the
+        # SDK starts storing a per-vault salt, that salt must join the key.
+        def _create_fernet(self, password: str):
+            path = getattr(self, "_path", None)
+            if path is None:
+                return super()._create_fernet(password)
+            key = (
+                str(Path(path).resolve()),
+                hashlib.blake2b(password.encode(), key=_KDF_CACHE_SALT,
+                                digest_size=16).digest(),
+            )
+            fernet = _KDF_CACHE.get(key)
+            if fernet is not None:
+                _KDF_CACHE.move_to_end(key)
+                return fernet
+
+            fernet = super()._create_fernet(password)
+            _KDF_CACHE[key] = fernet
+            if len(_KDF_CACHE) > _KDF_CACHE_SIZE:
+                _KDF_CACHE.popitem(last=False)
+            return fernet
+
+    # Fernet keeps its keys in immutable bytes, which cannot be wiped; the
+    # best available is to drop every reference before the process exits.
+    atexit.register(_KDF_CACHE.clear)
+    _file_backend_cls = CachedKeyFileBackend
+    return _file_backend_cls
+
+
+def _human_size(size: float) -> str:
+    """Format a file size for display."""
+    if size < 1024:
+        return f"{int(size)} bytes"
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024
+        if size < 1024 or unit == "GB":
+            break
+    return f"{size:.1f} {unit}"
+
+
+def _password_opts(f):
+    """
+    Add the --password and --password-stdin options.
+
+    The password is not prompted for by click; commands call
+    _prompt_password() once they know the vault exists, so a mistyped
+    path fails before any key derivation.
+    """
+    f = click.option("--password-stdin", is_flag=True,
+                     help="Read the vault password from stdin")(f)
+    f = click.option("--password", "-p", default=None,
+                     help="Vault password (prompted for if omitted)")(f)
+    return f
+
+
+def _common_vault_opts(f):
+    """Add the --vault, --password and --workspace options shared by commands."""
+    f = click.option("--workspace", "-w", default="default", help="Workspace name")(f)
+    f = _password_opts(f)
+    f = click.option("--vault", "-v", default=None, help="Path to vault file")(f)
+    return f
+
+
+def iter_credentials(client: "AVPClient", session_id: str,
+                     names: List[str]) -> Iterator[Tuple[str, bytes]]:
+    """Yield (name, value) pairs, using the client's bulk API when available."""
+    bulk = getattr(client, "retrieve_all", None)
+    if bulk is not None:
+        values = bulk(session_id)
+        for name in names:
+            if name in values:
+                yield name, values[name]
+        return
+    for name in names:
+        yield name, client.retrieve(session_id, name).value
+
+
+def store_all(client: "AVPClient", session_id: str,
+              items: Dict[str, bytearray]) -> None:
+    """Store several credentials, using the client's bulk API when available."""
+    bulk = getattr(client, "store_many", None)
+    if bulk is not None:
+        bulk(session_id, items)
+        return
+    for name, value in items.items():
+        client.store(session_id, name, value)
+
+
 @click.group()
 @click.version_option(version="0.1.0", prog_name="avp")
 def cli():
@@ -48,26 +317,33 @@ def cli():
 
 @cli.command()
 @click.option("--vault", "-v", default=None, help="Path to vault file")
-@click.option("--password", "-p", prompt=True, hide_input=True,
-              confirmation_prompt=True, help="Vault password")
-def init(vault: Optional[str], password: str):
+@_password_opts
+def init(vault: Optional[str], password: Optional[str], password_stdin: bool):
     """Initialize a new AVP vault."""
-    vault_path = Path(vault) if vault else get_default_vault_path()
+    from avp_cli.agent import agent_serves
+
+    vault_path = _resolve_vault(vault)
+    if agent_serves(vault_path):
+        _console().print(
+            f"[red]Error:[/red] An agent is serving {vault_path}; "
+            "run 'avp agent stop' first"
+        )
+        sys.exit(1)
+
+    password = _prompt_password(password, password_stdin, confirm=True)
 
     if vault_path.exists():
-        console.print(f"[yellow]Warning:[/yellow] Vault already exists at {vault_path}")
+        _console().print(f"[yellow]Warning:[/yellow] Vault already exists at {vault_path}")
         if not click.confirm("Overwrite existing vault?"):
             raise click.Abort()
 
-    vault_path.parent.mkdir(parents=True, exist_ok=True)
+    from rich.panel import Panel
 
     # Create and initialize vault
-    backend = FileBackend(str(vault_path), password)
-    client = AVPClient(backend)
-    session = client.authenticate(workspace="default")
-    client.close()
+    with open_vault(vault_path, password, ensure_dir=True) as client:
+        client.authenticate(workspace="default")
 
-    console.print(Panel(
+    _console().print(Panel(
         f"[green]Vault initialized successfully![/green]\n\n"
         f"Location: {vault_path}\n"
         f"Workspace: default",
@@ -78,154 +354,164 @@ def init(vault: Optional[str], password: str):
 @cli.command()
 @click.argument("key")
 @click.argument("value")
-@click.option("--vault", "-v", default=None, help="Path to vault file")
-@click.option("--password", "-p", prompt=True, hide_input=True, help="Vault password")
-@click.option("--workspace", "-w", default="default", help="Workspace name")
-def store(key: str, value: str, vault: Optional[str], password: str, workspace: str):
+@_common_vault_opts
+def store(key: str, value: str, vault: Optional[str], password: Optional[str],
+           password_stdin: bool, workspace: str):
     """Store a credential in the vault."""
-    vault_path = str(Path(vault) if vault else get_default_vault_path())
+    vault_path = _resolve_vault(vault)
+    password = _prompt_password(password, password_stdin)
 
-    client = create_client(vault_path, password)
-    session = client.authenticate(workspace=workspace)
+    with create_client(vault_path, password, ensure_dir=True) as client:
+        session = client.authenticate(workspace=workspace)
+        with _encoded(value) as buf:
+            client.store(session.session_id, key, buf)
 
-    client.store(session.session_id, key, value.encode())
-    client.close()
-
-    console.print(f"[green]✓[/green] Stored credential: [bold]{key}[/bold]")
+    _console().print(f"[green]✓[/green] Stored credential: [bold]{key}[/bold]")
 
 
 @cli.command("get")
 @click.argument("key")
-@click.option("--vault", "-v", default=None, help="Path to vault file")
-@click.option("--password", "-p", prompt=True, hide_input=True, help="Vault password")
-@click.option("--workspace", "-w", default="default", help="Workspace name")
+@_common_vault_opts
 @click.option("--quiet", "-q", is_flag=True, help="Output only the value")
-def get_credential(key: str, vault: Optional[str], password: str, workspace: str, quiet: bool):
+def get_credential(key: str, vault: Optional[str], password: Optional[str],
+                   password_stdin: bool, workspace: str, quiet: bool):
     """Retrieve a credential from the vault."""
-    vault_path = str(Path(vault) if vault else get_default_vault_path())
+    vault_path = _resolve_vault(vault)
+    _require_vault(vault_path)
+    password = _prompt_password(password, password_stdin)
 
-    client = create_client(vault_path, password)
-    session = client.authenticate(workspace=workspace)
+    with create_client(vault_path, password) as client:
+        session = client.authenticate(workspace=workspace)
 
-    try:
-        result = client.retrieve(session.session_id, key)
-        value = result.value.decode()
-
-        if quiet:
-            click.echo(value)
+        try:
+            result = client.retrieve(session.session_id, key)
+        except Exception as e:
+            _console().print(f"[red]Error:[/red] Credential '{key}' not found")
+            sys.exit(1)
+
+    if quiet:
+        # Write the raw bytes so binary values survive and nothing is
+        # decoded and re-encoded on the way out.
+        out = getattr(sys.stdout, "buffer", None)
+        if out is None:
+            click.echo(result.value.decode())
         else:
-            console.print(f"[bold]{key}[/bold]: {value}")
-    except Exception as e:
-        console.print(f"[red]Error:[/red] Credential '{key}' not found")
-        sys.exit(1)
-    finally:
-        client.close()
+            out.write(result.value)
+            out.write(b"\n")
+            out.flush()
+    else:
+        _console().print(f"[bold]{key}[/bold]: {result.value.decode()}")
 
 
 @cli.command("list")
-@click.option("--vault", "-v", default=None, help="Path to vault file")
-@click.option("--password", "-p", prompt=True, hide_input=True, help="Vault password")
-@click.option("--workspace", "-w", default="default", help="Workspace name")
-def list_credentials(vault: Optional[str], password: str, workspace: str):
+@_common_vault_opts
+def list_credentials(vault: Optional[str], password: Optional[str],
+                     password_stdin: bool, workspace: str):
     """List all credentials in the vault."""
-    vault_path = str(Path(vault) if vault else get_default_vault_path())
-
-    client = create_client(vault_path, password)
-    session = client.authenticate(workspace=workspace)
+    vault_path = _resolve_vault(vault)
+    _require_vault(vault_path)
+    password = _prompt_password(password, password_stdin)
 
-    result = client.list_secrets(session.session_id)
-    client.close()
+    with create_client(vault_path, password) as client:
+        session = client.authenticate(workspace=workspace)
+        result = client.list_secrets(session.session_id)
 
     if not result.secrets:
-        console.print("[dim]No credentials stored.[/dim]")
+        _console().print("[dim]No credentials stored.[/dim]")
         return
 
+    from rich.table import Table
+
     table = Table(title=f"Credentials in workspace: {workspace}")
     table.add_column("Key", style="cyan")
     table.add_column("Version", style="green")
     table.add_column("Created", style="dim")
 
-    for secret in result.secrets:
-        table.add_row(
-            secret.name,
-            str(getattr(secret, 'version', 1)),
-            getattr(secret, 'created_at', '-')
-        )
+    # Version and creation time live on the secret's metadata; probe for it
+    # once rather than per row.
+    if hasattr(result.secrets[0], "metadata"):
+        for secret in result.secrets:
+            metadata = secret.metadata
+            table.add_row(
+                secret.name,
+                str(metadata.version),
+                metadata.created_at.strftime("%Y-%m-%d %H:%M:%S")
+            )
+    else:
+        for secret in result.secrets:
+            table.add_row(secret.name, "1", "-")
 
-    console.print(table)
+    _console().print(table)
 
 
 @cli.command()
 @click.argument("key")
-@click.option("--vault", "-v", default=None, help="Path to vault file")
-@click.option("--password", "-p", prompt=True, hide_input=True, help="Vault password")
-@click.option("--workspace", "-w", default="default", help="Workspace name")
+@_common_vault_opts
 @click.option("--force", "-f", is_flag=True, help="Skip confirmation")
-def delete(key: str, vault: Optional[str], password: str, workspace: str, force: bool):
+def delete(key: str, vault: Optional[str], password: Optional[str],
+           password_stdin: bool, workspace: str, force: bool):
     """Delete a credential from the vault."""
-    vault_path = str(Path(vault) if vault else get_default_vault_path())
+    vault_path = _resolve_vault(vault)
+    _require_vault(vault_path)
+    password = _prompt_password(password, password_stdin)
 
     if not force:
         if not click.confirm(f"Delete credential '{key}'?"):
             raise click.Abort()
 
-    client = create_client(vault_path, password)
-    session = client.authenticate(workspace=workspace)
-
-    result = client.delete(session.session_id, key)
-    client.close()
+    with create_client(vault_path, password) as client:
+        session = client.authenticate(workspace=workspace)
+        result = client.delete(session.session_id, key)
 
     if result.deleted:
-        console.print(f"[green]✓[/green] Deleted credential: [bold]{key}[/bold]")
+        _console().print(f"[green]✓[/green] Deleted credential: [bold]{key}[/bold]")
     else:
-        console.print(f"[red]Error:[/red] Credential '{key}' not found")
+        _console().print(f"[red]Error:[/red] Credential '{key}' not found")
         sys.exit(1)
 
 
 @cli.command()
 @click.argument("key")
 @click.argument("new_value")
-@click.option("--vault", "-v", default=None, help="Path to vault file")
-@click.option("--password", "-p", prompt=True, hide_input=True, help="Vault password")
-@click.option("--workspace", "-w", default="default", help="Workspace name")
-def rotate(key: str, new_value: str, vault: Optional[str], password: str, workspace: str):
+@_common_vault_opts
+def rotate(key: str, new_value: str, vault: Optional[str],
+           password: Optional[str], password_stdin: bool, workspace: str):
     """Rotate a credential with version tracking."""
-    vault_path = str(Path(vault) if vault else get_default_vault_path())
+    vault_path = _resolve_vault(vault)
+    _require_vault(vault_path)
+    password = _prompt_password(password, password_stdin)
 
-    client = create_client(vault_path, password)
-    session = client.authenticate(workspace=workspace)
+    with create_client(vault_path, password, ensure_dir=True) as client:
+        session = client.authenticate(workspace=workspace)
 
-    try:
-        client.rotate(session.session_id, key, new_value.encode())
-        console.print(f"[green]✓[/green] Rotated credential: [bold]{key}[/bold]")
-    except Exception as e:
-        console.print(f"[red]Error:[/red] Failed to rotate '{key}': {e}")
-        sys.exit(1)
-    finally:
-        client.close()
+        try:
+            with _encoded(new_value) as buf:
+                client.rotate(session.session_id, key, buf)
+            _console().print(f"[green]✓[/green] Rotated credential: [bold]{key}[/bold]")
+        except Exception as e:
+            _console().print(f"[red]Error:[/red] Failed to rotate '{key}': {e}")
+            sys.exit(1)
 
 
 @cli.command()
-@click.option("--vault", "-v", default=None, help="Path to vault file")
-@click.option("--password", "-p", prompt=True, hide_input=True, help="Vault password")
-def info(vault: Optional[str], password: str):
+@_common_vault_opts
+def info(vault: Optional[str], password: Optional[str],
+         password_stdin: bool, workspace: str):
     """Show vault information."""
-    vault_path = Path(vault) if vault else get_default_vault_path()
+    vault_path = _resolve_vault(vault)
 
-    if not vault_path.exists():
-        console.print(f"[red]Error:[/red] No vault found at {vault_path}")
-        console.print("Run 'avp init' to create a new vault.")
-        sys.exit(1)
+    _require_vault(vault_path)
+    password = _prompt_password(password, password_stdin)
+
+    with create_client(vault_path, password) as client:
+        session = client.authenticate(workspace=workspace)
+        result = client.list_secrets(session.session_id)
 
-    client = create_client(str(vault_path), password)
-    session = client.authenticate(workspace="default")
-    result = client.list_secrets(session.session_id)
-    client.close()
+    size_str = _human_size(vault_path.stat().st_size)
 
-    size = vault_path.stat().st_size
-    size_str = f"{size / 1024:.1f} KB" if size > 1024 else f"{size} bytes"
+    from rich.panel import Panel
 
-    console.print(Panel(
+    _console().print(Panel(
         f"[bold]Vault Path:[/bold] {vault_path}\n"
         f"[bold]Size:[/bold] {size_str}\n"
         f"[bold]Credentials:[/bold] {len(result.secrets)}",
@@ -235,86 +521,175 @@ def info(vault: Optional[str], password: str):
 
 @cli.command()
 @click.argument("source")
-@click.option("--vault", "-v", default=None, help="Path to vault file")
-@click.option("--password", "-p", prompt=True, hide_input=True, help="Vault password")
-@click.option("--workspace", "-w", default="default", help="Workspace name")
-@click.option("--format", "-f", "fmt", type=click.Choice(["json", "env", "dotenv"]),
+@_common_vault_opts
+@click.option("--format", "-f", "fmt", type=_FMT_CHOICE,
               default="json", help="Source format")
-def import_credentials(source: str, vault: Optional[str], password: str,
-                       workspace: str, fmt: str):
+def import_credentials(source: str, vault: Optional[str], password: Optional[str],
+                       password_stdin: bool, workspace: str, fmt: str):
     """Import credentials from a file."""
-    import json
-
-    vault_path = str(Path(vault) if vault else get_default_vault_path())
+    vault_path = _resolve_vault(vault)
     source_path = Path(source)
 
     if not source_path.exists():
-        console.print(f"[red]Error:[/red] Source file not found: {source}")
+        _console().print(f"[red]Error:[/red] Source file not found: {source}")
         sys.exit(1)
 
-    client = create_client(vault_path, password)
-    session = client.authenticate(workspace=workspace)
-
-    count = 0
-    with open(source_path) as f:
-        if fmt == "json":
-            data = json.load(f)
-            for key, value in data.items():
-                if isinstance(value, str):
-                    client.store(session.session_id, key, value.encode())
-                    count += 1
-        else:  # env or dotenv
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith("#") and "=" in line:
-                    key, value = line.split("=", 1)
-                    value = value.strip().strip('"').strip("'")
-                    client.store(session.session_id, key.strip(), value.encode())
-                    count += 1
+    # Collect everything first so the vault is written once, not per key.
+    pending: Dict[str, bytearray] = {}
+    if fmt == "json":
+        data = _get_json().loads(source_path.read_bytes())
+        for key, value in data.items():
+            if isinstance(value, str):
+                pending[key] = bytearray(value, "utf-8")
+    else:  # env or dotenv
+        with open(source_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size > _MMAP_THRESHOLD:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = f.read()
+            try:
+                for m in _DOTENV_RE.finditer(data):
+                    value = m.group(2) or m.group(3) or m.group(4) or b""
+                    try:
+                        value.decode("utf-8")
+                    except UnicodeDecodeError:
+                        line = data[:m.start()].count(b"\n") + 1
+                        for buf in pending.values():
+                            _wipe(buf)
+                        _console().print(
+                            f"[red]Error:[/red] {source}:{line}: value is not valid UTF-8"
+                        )
+                        sys.exit(1)
+                    pending[m.group(1).decode()] = bytearray(value)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+    password = _prompt_password(password, password_stdin)
+
+    # One session covers the whole import; the client is closed (and the
+    # pending buffers wiped) even if a store fails partway through.
+    try:
+        with create_client(vault_path, password, ensure_dir=True) as client:
+            session = client.authenticate(workspace=workspace)
+            store_all(client, session.session_id, pending)
+    finally:
+        for buf in pending.values():
+            _wipe(buf)
+    count = len(pending)
 
-    client.close()
-    console.print(f"[green]✓[/green] Imported {count} credentials from {source}")
+    _console().print(f"[green]✓[/green] Imported {count} credentials from {source}")
 
 
 @cli.command("export")
 @click.argument("destination")
-@click.option("--vault", "-v", default=None, help="Path to vault file")
-@click.option("--password", "-p", prompt=True, hide_input=True, help="Vault password")
-@click.option("--workspace", "-w", default="default", help="Workspace name")
-@click.option("--format", "-f", "fmt", type=click.Choice(["json", "env", "dotenv"]),
+@_common_vault_opts
+@click.option("--format", "-f", "fmt", type=_FMT_CHOICE,
               default="json", help="Export format")
-def export_credentials(destination: str, vault: Optional[str], password: str,
-                       workspace: str, fmt: str):
+def export_credentials(destination: str, vault: Optional[str], password: Optional[str],
+                       password_stdin: bool, workspace: str, fmt: str):
     """Export credentials to a file."""
-    import json
-
-    vault_path = str(Path(vault) if vault else get_default_vault_path())
+    vault_path = _resolve_vault(vault)
     dest_path = Path(destination)
 
-    client = create_client(vault_path, password)
-    session = client.authenticate(workspace=workspace)
+    _require_vault(vault_path)
+    password = _prompt_password(password, password_stdin)
+
+    # One session covers the listing and every retrieve.
+    with create_client(vault_path, password) as client:
+        session = client.authenticate(workspace=workspace)
+        result = client.list_secrets(session.session_id)
+        names = [secret.name for secret in result.secrets]
+
+        # Write each value as it is retrieved rather than collecting them
+        # all, so only one plaintext credential is held in memory at a time.
+        count = 0
+        try:
+            f = open(dest_path, "w", encoding="utf-8")
+        except OSError as e:
+            _console().print(f"[red]Error:[/red] Cannot write {destination}: {e.strerror}")
+            sys.exit(1)
+
+        # The file is ours from here on, so a partial export is removed.
+        try:
+            with f:
+                if fmt == "json":
+                    f.write("{")
+                for key, value in iter_credentials(client, session.session_id, names):
+                    if fmt == "json":
+                        sep = "," if count else ""
+                        f.write(f"{sep}\n  {_json_dumps(key)}: {_json_dumps(value.decode())}")
+                    else:  # env or dotenv
+                        f.write(f'{key}="{value.decode()}"\n')
+                    count += 1
+                if fmt == "json":
+                    f.write("\n}\n" if count else "}\n")
+        except Exception as e:
+            dest_path.unlink(missing_ok=True)
+            _console().print(f"[red]Error:[/red] Failed to export credentials: {e}")
+            sys.exit(1)
+
+    _console().print(f"[green]✓[/green] Exported {count} credentials to {destination}")
+    _console().print(f"[yellow]Warning:[/yellow] Exported file contains sensitive data!")
+
+
+@cli.group()
+def agent():
+    """Keep an unlocked vault in memory to skip key derivation."""
+    pass
+
 
-    result = client.list_secrets(session.session_id)
+@agent.command("start")
+@click.option("--vault", "-v", default=None, help="Path to vault file")
+@_password_opts
+@click.option("--foreground", is_flag=True, help="Do not detach from the terminal")
+def agent_start(vault: Optional[str], password: Optional[str], password_stdin: bool,
+                foreground: bool):
+    """Start the vault agent."""
+    from avp_cli.agent import AgentServer, agent_running
+
+    vault_path = _resolve_vault(vault)
+
+    _require_vault(vault_path)
+    if agent_running():
+        _console().print("[red]Error:[/red] An agent is already running")
+        sys.exit(1)
+    password = _prompt_password(password, password_stdin)
 
-    credentials = {}
-    for secret in result.secrets:
+    client = open_vault(vault_path, password)
+    try:
+        server = AgentServer(client, vault_path, password)
+    except RuntimeError as e:
+        _console().print(f"[red]Error:[/red] {e}")
+        sys.exit(1)
+
+    if foreground or not hasattr(os, "fork"):
+        _console().print(f"[green]✓[/green] Agent listening on {server.path}")
+        server.serve_forever()
+        return
+
+    if os.fork() == 0:
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
         try:
-            value = client.retrieve(session.session_id, secret.name)
-            credentials[secret.name] = value.value.decode()
-        except Exception:
-            pass
-
-    client.close()
-
-    with open(dest_path, "w") as f:
-        if fmt == "json":
-            json.dump(credentials, f, indent=2)
-        else:  # env or dotenv
-            for key, value in credentials.items():
-                f.write(f'{key}="{value}"\n')
-
-    console.print(f"[green]✓[/green] Exported {len(credentials)} credentials to {destination}")
-    console.print(f"[yellow]Warning:[/yellow] Exported file contains sensitive data!")
+            server.serve_forever()
+        finally:
+            os._exit(0)
+
+    _console().print(f"[green]✓[/green] Agent started on {server.path}")
+
+
+@agent.command("stop")
+def agent_stop():
+    """Stop the vault agent and discard the unlocked key."""
+    from avp_cli.agent import stop_agent
+
+    if stop_agent():
+        _console().print("[green]✓[/green] Agent stopped")
+    else:
+        _console().print("[yellow]Warning:[/yellow] No agent is running")
 
 
 if __name__ == "__main__":
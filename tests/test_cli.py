@@ -1,12 +1,17 @@
 """Tests for AVP CLI."""
 
+import json
+import subprocess
+import sys
 import tempfile
+import threading
+import time
 from pathlib import Path
 
 import pytest
 from click.testing import CliRunner
 
-from avp_cli.main import cli
+from avp_cli.main import _human_size, cli, iter_credentials, store_all
 
 
 class TestCLI:
@@ -35,6 +40,18 @@ class TestCLI:
         assert result.exit_code == 0
         assert "Agent Vault Protocol CLI" in result.output
 
+    def test_lazy_imports(self):
+        """Test that importing the CLI does not load rich, the SDK or ctypes."""
+        code = (
+            "import sys, avp_cli; "
+            "print(sorted({'rich', 'avp', 'ctypes'} & set(sys.modules)))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+        assert result.returncode == 0
+        assert result.stdout.strip() == "[]"
+
     def test_init_vault(self, runner, temp_vault):
         """Test vault initialization."""
         result = runner.invoke(cli, [
@@ -46,6 +63,13 @@ class TestCLI:
         assert "Vault initialized" in result.output
         assert Path(temp_vault).exists()
 
+    def test_missing_vault_skips_password_prompt(self, runner, temp_vault):
+        """Test that a missing vault is reported before asking for a password."""
+        result = runner.invoke(cli, ["get", "mykey", "--vault", temp_vault])
+        assert result.exit_code == 1
+        assert "No vault found" in result.output
+        assert "Password" not in result.output
+
     def test_store_and_get(self, runner, temp_vault):
         """Test storing and retrieving credentials."""
         # Initialize vault
@@ -62,7 +86,7 @@ class TestCLI:
             "--password", "testpass123"
         ])
         assert result.exit_code == 0
-        assert "Stored credential" in result.output
+        assert result.output.strip() == "✓ Stored credential: mykey"
 
         # Get credential
         result = runner.invoke(cli, [
@@ -73,6 +97,35 @@ class TestCLI:
         assert result.exit_code == 0
         assert "myvalue" in result.output
 
+    def test_password_stdin(self, runner, temp_vault):
+        """Test reading the vault password from stdin."""
+        result = runner.invoke(cli, [
+            "init", "--vault", temp_vault, "--password-stdin"
+        ], input="testpass123\n")
+        assert result.exit_code == 0
+
+        runner.invoke(cli, [
+            "store", "stdin_key", "stdin_value",
+            "--vault", temp_vault,
+            "--password-stdin"
+        ], input="testpass123\n")
+
+        result = runner.invoke(cli, [
+            "get", "stdin_key", "--quiet",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        assert result.output.strip() == "stdin_value"
+
+        result = runner.invoke(cli, [
+            "get", "stdin_key",
+            "--vault", temp_vault,
+            "--password", "testpass123",
+            "--password-stdin"
+        ], input="testpass123\n")
+        assert result.exit_code == 2
+        assert "mutually exclusive" in result.output
+
     def test_list_credentials(self, runner, temp_vault):
         """Test listing credentials."""
         # Initialize vault
@@ -180,3 +233,410 @@ class TestCLI:
             "--password", "testpass123"
         ])
         assert result.output.strip() == "quiet_value"
+
+    def test_info(self, runner, temp_vault):
+        """Test vault information output."""
+        runner.invoke(cli, [
+            "init",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        runner.invoke(cli, [
+            "store", "info_key", "info_value",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+
+        result = runner.invoke(cli, [
+            "info",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        assert result.exit_code == 0
+        assert "Credentials: 1" in result.output
+        assert "bytes" in result.output
+
+    def test_human_size(self):
+        """Test file size formatting across units."""
+        assert _human_size(0) == "0 bytes"
+        assert _human_size(1023) == "1023 bytes"
+        assert _human_size(1536) == "1.5 KB"
+        assert _human_size(5 * 1024 ** 2) == "5.0 MB"
+        assert _human_size(2 * 1024 ** 3) == "2.0 GB"
+        assert _human_size(3 * 1024 ** 4) == "3072.0 GB"
+
+    def test_export_credentials(self, runner, temp_vault):
+        """Test exporting credentials to JSON."""
+        runner.invoke(cli, [
+            "init",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        runner.invoke(cli, [
+            "store", "export_key", "export_value",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+
+        dest = str(Path(temp_vault).parent / "export.json")
+        result = runner.invoke(cli, [
+            "export", dest,
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        assert result.exit_code == 0
+        assert "Exported 1 credentials" in result.output
+        assert json.loads(Path(dest).read_text()) == {"export_key": "export_value"}
+
+    def test_export_to_directory(self, runner, temp_vault):
+        """Test that an unwritable destination is reported, not removed."""
+        runner.invoke(cli, [
+            "init",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+
+        dest = Path(temp_vault).parent / "out"
+        dest.mkdir()
+        result = runner.invoke(cli, [
+            "export", str(dest),
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        assert result.exit_code == 1
+        assert "Cannot write" in result.output
+        assert dest.is_dir()
+
+    def test_iter_credentials(self):
+        """Test that iter_credentials prefers a bulk retrieve and falls back to a loop."""
+        class Result:
+            def __init__(self, value):
+                self.value = value
+
+        class Client:
+            def __init__(self):
+                self.calls = []
+
+            def retrieve(self, session_id, name):
+                self.calls.append(("retrieve", session_id, name))
+                return Result(name.lower().encode())
+
+        class BulkClient(Client):
+            def retrieve_all(self, session_id):
+                self.calls.append(("retrieve_all", session_id))
+                return {"A": b"a", "B": b"b", "EXTRA": b"x"}
+
+        client = Client()
+        assert list(iter_credentials(client, "sid", ["A", "B"])) == [
+            ("A", b"a"), ("B", b"b")
+        ]
+        assert client.calls == [("retrieve", "sid", "A"), ("retrieve", "sid", "B")]
+
+        client = BulkClient()
+        assert list(iter_credentials(client, "sid", ["B", "A", "MISSING"])) == [
+            ("B", b"b"), ("A", b"a")
+        ]
+        assert client.calls == [("retrieve_all", "sid")]
+
+    def test_store_all(self):
+        """Test that store_all prefers a bulk store and falls back to a loop."""
+        class Client:
+            def __init__(self):
+                self.calls = []
+
+            def store(self, session_id, name, value):
+                self.calls.append(("store", session_id, name, value))
+
+        class BulkClient(Client):
+            def store_many(self, session_id, items):
+                self.calls.append(("store_many", session_id, dict(items)))
+
+        items = {"A": bytearray(b"1"), "B": bytearray(b"2")}
+
+        client = Client()
+        store_all(client, "sid", items)
+        assert client.calls == [("store", "sid", "A", b"1"),
+                                ("store", "sid", "B", b"2")]
+
+        client = BulkClient()
+        store_all(client, "sid", items)
+        assert client.calls == [("store_many", "sid", items)]
+
+    def test_import_json(self, runner, temp_vault):
+        """Test importing credentials from a JSON file."""
+        runner.invoke(cli, [
+            "init",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+
+        source = Path(temp_vault).parent / "creds.json"
+        source.write_text(json.dumps({"json_key": "json_value", "skipped": 1}))
+        result = runner.invoke(cli, [
+            "import-credentials", str(source),
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        assert result.exit_code == 0
+        assert "Imported 1 credentials" in result.output
+
+        result = runner.invoke(cli, [
+            "get", "json_key", "--quiet",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        assert result.output.strip() == "json_value"
+
+    def test_import_dotenv(self, runner, temp_vault):
+        """Test importing credentials from a dotenv file."""
+        runner.invoke(cli, [
+            "init",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+
+        source = Path(temp_vault).parent / ".env"
+        source.write_text(
+            "# comment\n"
+            "\n"
+            "PLAIN=plain_value\n"
+            "export QUOTED=\"two words\"  # trailing comment\n"
+            "TOKEN='abc=def'\n"
+            "SPACED=a" + " " * 20000 + "b\n"
+        )
+        result = runner.invoke(cli, [
+            "import-credentials", str(source), "--format", "dotenv",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        assert result.exit_code == 0
+        assert "Imported 4 credentials" in result.output
+
+        for key, expected in [("PLAIN", "plain_value"),
+                              ("QUOTED", "two words"),
+                              ("TOKEN", "abc=def"),
+                              ("SPACED", "a" + " " * 20000 + "b")]:
+            result = runner.invoke(cli, [
+                "get", key, "--quiet",
+                "--vault", temp_vault,
+                "--password", "testpass123"
+            ])
+            assert result.output.strip() == expected
+
+    def test_import_dotenv_rejects_invalid_utf8(self, runner, temp_vault):
+        """Test that a dotenv value that is not UTF-8 fails the import."""
+        source = Path(temp_vault).parent / ".env"
+        source.write_bytes(b"GOOD=value\nBAD=\xff\xfe\n")
+        result = runner.invoke(cli, [
+            "import-credentials", str(source), "--format", "dotenv",
+            "--vault", temp_vault
+        ])
+        assert result.exit_code == 1
+        assert ":2: value is not valid UTF-8" in result.output
+        assert "Password" not in result.output
+
+    def test_import_large_dotenv_rejects_invalid_utf8(self, runner, temp_vault,
+                                                     monkeypatch):
+        """Test that invalid UTF-8 is reported from a memory-mapped source."""
+        import avp_cli.main
+
+        monkeypatch.setattr(avp_cli.main, "_MMAP_THRESHOLD", 16)
+        source = Path(temp_vault).parent / ".env"
+        source.write_bytes(b"GOOD=value\nALSO_GOOD=value\nBAD=\xff\xfe\n")
+        result = runner.invoke(cli, [
+            "import-credentials", str(source), "--format", "dotenv",
+            "--vault", temp_vault
+        ])
+        assert result.exit_code == 1
+        assert ":3: value is not valid UTF-8" in result.output
+
+    def test_import_large_dotenv(self, runner, temp_vault):
+        """Test importing a dotenv file large enough to be memory-mapped."""
+        runner.invoke(cli, [
+            "init",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+
+        source = Path(temp_vault).parent / ".env"
+        source.write_text("# padding\n" * 200000 + "LARGE_KEY=large_value\n")
+        result = runner.invoke(cli, [
+            "import-credentials", str(source), "--format", "dotenv",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        assert result.exit_code == 0
+        assert "Imported 1 credentials" in result.output
+
+        result = runner.invoke(cli, [
+            "get", "LARGE_KEY", "--quiet",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        assert result.output.strip() == "large_value"
+
+    def test_key_derivation_is_cached(self, runner, temp_vault, monkeypatch):
+        """Test that repeated commands in one process derive the key once."""
+        from avp.backends.file import FileBackend
+
+        calls = []
+        create_fernet = FileBackend._create_fernet
+
+        def counting_create_fernet(self, password):
+            calls.append(password)
+            return create_fernet(self, password)
+
+        monkeypatch.setattr(FileBackend, "_create_fernet", counting_create_fernet)
+
+        runner.invoke(cli, [
+            "init",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        for key in ("cached1", "cached2"):
+            result = runner.invoke(cli, [
+                "store", key, "value",
+                "--vault", temp_vault,
+                "--password", "testpass123"
+            ])
+            assert result.exit_code == 0
+        result = runner.invoke(cli, [
+            "list",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+        assert "cached2" in result.output
+        assert len(calls) == 1
+
+        result = runner.invoke(cli, [
+            "list",
+            "--vault", temp_vault,
+            "--password", "wrongpass"
+        ])
+        assert result.exit_code != 0
+        assert len(calls) == 2
+
+    def test_agent_serves_commands(self, runner, temp_vault, monkeypatch):
+        """Test that commands are proxied through a running agent."""
+        from avp_cli.agent import AgentServer, connect_agent
+        from avp_cli.main import open_vault
+
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(Path(temp_vault).parent))
+        runner.invoke(cli, [
+            "init",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+
+        vault_path = Path(temp_vault)
+        server = AgentServer(open_vault(vault_path, "testpass123"),
+                             vault_path, "testpass123")
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        sessions = server._client._sessions
+
+        def no_fallback(*args, **kwargs):
+            raise AssertionError("command bypassed the agent")
+
+        monkeypatch.setattr("avp_cli.main.open_vault", no_fallback)
+        try:
+            assert connect_agent(vault_path, "wrongpass") is None
+            client = connect_agent(vault_path, "testpass123")
+            assert client is not None
+            client.close()
+
+            result = runner.invoke(cli, [
+                "store", "agent_key", "agent_value",
+                "--vault", temp_vault,
+                "--password", "testpass123"
+            ])
+            assert result.exit_code == 0
+
+            result = runner.invoke(cli, [
+                "get", "agent_key", "--quiet",
+                "--vault", temp_vault,
+                "--password", "testpass123"
+            ])
+            assert result.output.strip() == "agent_value"
+
+            # Writes made without the agent are picked up, not overwritten.
+            with open_vault(vault_path, "testpass123") as direct:
+                session = direct.authenticate(workspace="default")
+                direct.store(session.session_id, "direct_key", b"direct_value")
+
+            result = runner.invoke(cli, [
+                "get", "direct_key", "--quiet",
+                "--vault", temp_vault,
+                "--password", "testpass123"
+            ])
+            assert result.output.strip() == "direct_value"
+
+            # Session, list, rotate and info responses carry dataclasses,
+            # enums and datetimes, which must survive the frame encoding.
+            for args in (["list"], ["rotate", "agent_key", "rotated"], ["info"],
+                         ["export", str(vault_path.parent / "out.json")],
+                         ["delete", "direct_key", "--force"]):
+                result = runner.invoke(cli, args + [
+                    "--vault", temp_vault,
+                    "--password", "testpass123"
+                ])
+                assert result.exit_code == 0, result.output
+            assert json.loads((vault_path.parent / "out.json").read_text()) == {
+                "agent_key": "rotated", "direct_key": "direct_value"
+            }
+
+            # Each command's session ends with its connection.
+            for _ in range(50):
+                if not sessions:
+                    break
+                time.sleep(0.01)
+            assert not sessions
+
+            result = runner.invoke(cli, [
+                "init",
+                "--vault", temp_vault,
+                "--password", "testpass123"
+            ])
+            assert result.exit_code == 1
+            assert "avp agent stop" in result.output
+        finally:
+            result = runner.invoke(cli, ["agent", "stop"])
+            thread.join(timeout=5)
+
+        assert result.exit_code == 0
+        assert "Agent stopped" in result.output
+        assert not thread.is_alive()
+        assert not server.path.exists()
+
+        with open_vault(vault_path, "testpass123") as direct:
+            session = direct.authenticate(workspace="default")
+            names = [s.name for s in direct.list_secrets(session.session_id).secrets]
+            assert names == ["agent_key"]
+            assert direct.retrieve(session.session_id, "agent_key").value == b"rotated"
+
+    def test_unresponsive_agent_falls_back(self, runner, temp_vault, monkeypatch):
+        """Test that a listener that never answers does not hang commands."""
+        import socket
+
+        from avp_cli import agent
+
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(Path(temp_vault).parent))
+        monkeypatch.setattr(agent, "_CONNECT_TIMEOUT", 0.2)
+        runner.invoke(cli, [
+            "init",
+            "--vault", temp_vault,
+            "--password", "testpass123"
+        ])
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(str(agent.get_agent_socket_path()))
+        listener.listen(1)
+        try:
+            result = runner.invoke(cli, [
+                "store", "key", "value",
+                "--vault", temp_vault,
+                "--password", "testpass123"
+            ])
+        finally:
+            listener.close()
+        assert result.exit_code == 0